@@ -0,0 +1,401 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import profiling
+from ingestion import ingest_logs
+from calculations import (
+    calculate_audience_splits, calculate_budget, calculate_budget_cube, calculate_cpc_budget,
+    calculate_cpm_budget, calculate_retargeting_budget, calculate_revenue, calculate_roas,
+    calculate_target_audience, calculate_target_audience_frame
+)
+
+
+# Freistadt defaults, matching the fallback values in main.py
+BASE_INPUTS = {
+    "total_population": 72462,
+    "foreign_percentage": 3.6,
+    "age_distribution": {
+        "30-34": 321471 + 307544,
+        "35-39": 318121 + 308328,
+        "40-44": 312960 + 308711,
+        "45-49": 289004 + 289029,
+        "50-54": 317491 + 324150,
+        "55-59": 357812 + 358600,
+        "60-64": 330858 + 338782,
+    },
+    "homeownership_rates": {
+        "30-34": 0.35, "35-39": 0.50, "40-44": 0.60, "45-49": 0.70,
+        "50-54": 0.75, "55-59": 0.80, "60-64": 0.85,
+    },
+    "education_rate": 0.304,
+    "social_media_usage_sarah": {"Meta (Facebook/Instagram)": 0.7, "YouTube": 0.8, "LinkedIn": 0.3},
+    "social_media_usage_non_sarah": {"Meta (Facebook/Instagram)": 0.6, "YouTube": 0.65, "LinkedIn": 0.2},
+    "margin_of_errors": {"Demographics": 1.5, "Homeownership": 3.0, "Social Media": 5.0},
+}
+
+CPM_RANGES = {
+    "Google Display": (5, 10),
+    "YouTube": (10, 20),
+    "Meta (Facebook/Instagram)": (10, 20),
+    "LinkedIn": (30, 50)
+}
+RETARGETING_CPM = {"Meta (Facebook/Instagram)": 15, "LinkedIn": 40}
+
+# Reference outputs for BASE_INPUTS; any change here is a change in results, not just in speed
+GOLDEN = {
+    "calculate_target_audience": {
+        "Sarah_Effective_Reach": 3966,
+        "Non_Sarah_Effective_Reach": 16549,
+        "Sarah_Effective_Reach_Higher_Ed": 1206,
+        "Non_Sarah_Effective_Reach_Higher_Ed": 5031,
+        "Margin_of_Error": 6.02,
+    },
+    "calculate_budget": {
+        "Google Display - Sarah (höhere Bildung)": [60, 90, 121],
+        "Google Display - Nicht-Sarah (höhere Bildung)": [252, 377, 503],
+        "Google Display - Alle ohne höhere Bildung": [3311, 4967, 6622],
+        "YouTube - Sarah (höhere Bildung)": [121, 181, 241],
+        "YouTube - Nicht-Sarah (höhere Bildung)": [503, 755, 1006],
+        "YouTube - Alle ohne höhere Bildung": [6622, 9934, 13245],
+        "Meta (Facebook/Instagram) - Sarah (höhere Bildung)": [121, 181, 241],
+        "Meta (Facebook/Instagram) - Nicht-Sarah (höhere Bildung)": [503, 755, 1006],
+        "Meta (Facebook/Instagram) - Alle ohne höhere Bildung": [6622, 9934, 13245],
+        "LinkedIn - Sarah (höhere Bildung)": [362, 482, 603],
+        "LinkedIn - Nicht-Sarah (höhere Bildung)": [1509, 2012, 2516],
+        "LinkedIn - Alle ohne höhere Bildung": [19868, 26490, 33112],
+    },
+    "calculate_retargeting_budget": {
+        "0.1": {
+            "Meta (Facebook/Instagram) - Sarah (höhere Bildung)": 18,
+            "Meta (Facebook/Instagram) - Nicht-Sarah (höhere Bildung)": 75,
+            "Meta (Facebook/Instagram) - Alle ohne höhere Bildung": 993,
+            "LinkedIn - Sarah (höhere Bildung)": 48,
+            "LinkedIn - Nicht-Sarah (höhere Bildung)": 201,
+            "LinkedIn - Alle ohne höhere Bildung": 2649,
+        },
+        "0.5": {
+            "Meta (Facebook/Instagram) - Sarah (höhere Bildung)": 90,
+            "Meta (Facebook/Instagram) - Nicht-Sarah (höhere Bildung)": 377,
+            "Meta (Facebook/Instagram) - Alle ohne höhere Bildung": 4967,
+            "LinkedIn - Sarah (höhere Bildung)": 241,
+            "LinkedIn - Nicht-Sarah (höhere Bildung)": 1006,
+            "LinkedIn - Alle ohne höhere Bildung": 13245,
+        },
+    },
+    "calculate_cpm_budget": 1543.12,
+    "calculate_cpc_budget": 838.95,
+    "calculate_revenue": 44950.0,
+    "calculate_roas": 3.6,
+    "calculate_roas_zero_spend": 0,
+}
+
+SIZES = (1, 1_000, 100_000, 1_000_000)
+
+
+def generate_scenarios(n, seed=0):
+    """Generates n random scenarios around the Freistadt defaults, one row per scenario."""
+    rng = np.random.default_rng(seed)
+    columns = {"Higher Education Rate": rng.uniform(0.2, 0.4, n)}
+    for age in BASE_INPUTS["homeownership_rates"]:
+        columns[f"Homeownership {age}"] = rng.uniform(0.2, 0.95, n)
+    for platform_name in BASE_INPUTS["social_media_usage_sarah"]:
+        columns[f"Usage Sarah {platform_name}"] = rng.uniform(0.1, 0.9, n)
+        columns[f"Usage Non-Sarah {platform_name}"] = rng.uniform(0.1, 0.9, n)
+    return pd.DataFrame(columns)
+
+
+def generate_audience_splits(n, seed=0):
+    """Generates n audience splits with sizes between 100 and 100,000 people."""
+    rng = np.random.default_rng(seed)
+    return {f"Audience {index}": int(size) for index, size in enumerate(rng.integers(100, 100_000, n))}
+
+
+def generate_helper_inputs(n, seed=0):
+    """Generates n rows of inputs for the scalar CPM, CPC, revenue and ROAS helpers."""
+    rng = np.random.default_rng(seed)
+    return {
+        "audience_size": rng.integers(100, 100_000, n).tolist(),
+        "impressions_per_user": rng.integers(1, 20, n).tolist(),
+        "cpm": rng.uniform(5, 50, n).tolist(),
+        "clicks": rng.integers(0, 5_000, n).tolist(),
+        "cpc": rng.uniform(0.2, 3, n).tolist(),
+        "traffic": rng.integers(0, 50_000, n).tolist(),
+        "conversion_rate": rng.uniform(0.005, 0.05, n).tolist(),
+        "avg_order_value": rng.uniform(20, 200, n).tolist(),
+        "ad_spend": rng.uniform(0, 10_000, n).round(2).tolist(),
+    }
+
+
+def scalar_inputs(scenarios):
+    """Builds the calculate_target_audience arguments for each scenario row."""
+    arguments = []
+    for row in scenarios.to_dict("records"):
+        inputs = dict(BASE_INPUTS)
+        inputs["education_rate"] = row["Higher Education Rate"]
+        inputs["homeownership_rates"] = {age: row[f"Homeownership {age}"] for age in BASE_INPUTS["homeownership_rates"]}
+        inputs["social_media_usage_sarah"] = {
+            platform_name: row[f"Usage Sarah {platform_name}"] for platform_name in BASE_INPUTS["social_media_usage_sarah"]
+        }
+        inputs["social_media_usage_non_sarah"] = {
+            platform_name: row[f"Usage Non-Sarah {platform_name}"]
+            for platform_name in BASE_INPUTS["social_media_usage_non_sarah"]
+        }
+        arguments.append(inputs)
+    return arguments
+
+
+def run_scalar(scenarios):
+    """Evaluates the scenarios one by one with calculate_target_audience."""
+    return pd.DataFrame([calculate_target_audience(**inputs) for inputs in scalar_inputs(scenarios)])
+
+
+def benchmark_target_audience_batch(sizes=(10_000, 1_000_000), scalar_limit=10_000):
+    """
+    Times the scalar loop against calculate_target_audience_frame and checks that both agree.
+
+    The scalar loop is only run on the first ``scalar_limit`` scenarios; its per-scenario time is
+    extrapolated for larger sizes.
+    """
+    rows = []
+    for n in sizes:
+        scenarios = generate_scenarios(n)
+
+        start = time.perf_counter()
+        batch = calculate_target_audience_frame(scenarios, **BASE_INPUTS)
+        batch_seconds = time.perf_counter() - start
+
+        arguments = scalar_inputs(scenarios.iloc[:min(n, scalar_limit)])
+        start = time.perf_counter()
+        scalar = [calculate_target_audience(**inputs) for inputs in arguments]
+        scalar_seconds = (time.perf_counter() - start) * n / len(arguments)
+        scalar = pd.DataFrame(scalar)
+
+        mismatches = int((batch.iloc[:len(scalar)][scalar.columns].to_numpy() != scalar.to_numpy()).any(axis=1).sum())
+        rows.append({
+            "scenarios": n,
+            "scalar_s": scalar_seconds,
+            "batch_s": batch_seconds,
+            "speedup": scalar_seconds / batch_seconds,
+            "mismatches": mismatches,
+        })
+
+    return pd.DataFrame(rows)
+
+
+def check_golden():
+    """Recomputes the reference outputs and returns a list of mismatching names (empty when all match)."""
+    audience = calculate_target_audience(**BASE_INPUTS)
+    splits = calculate_audience_splits(audience, BASE_INPUTS["total_population"])
+    retargeting = calculate_retargeting_budget(splits, RETARGETING_CPM, 10, [0.1, 0.5])
+    actual = {
+        "calculate_target_audience": {key: float(value) for key, value in audience.items()},
+        "calculate_budget": {key: list(value) for key, value in calculate_budget(splits, CPM_RANGES, 10, [None]).items()},
+        "calculate_retargeting_budget": {str(level): budgets for level, budgets in retargeting.items()},
+        "calculate_cpm_budget": calculate_cpm_budget(12345, 10, 12.5),
+        "calculate_cpc_budget": calculate_cpc_budget(987, 0.85),
+        "calculate_revenue": calculate_revenue(20000, 0.025, 89.9),
+        "calculate_roas": calculate_roas(44950, 12500),
+        "calculate_roas_zero_spend": calculate_roas(1, 0),
+    }
+    failures = [name for name, expected in GOLDEN.items() if actual[name] != expected]
+    if not check_ingestion_chunking():
+        failures.append("ingest_logs_chunking")
+    return failures
+
+
+def check_ingestion_chunking(n=50_000, users=5_000, seed=0):
+    """
+    Checks that ingest_logs gives the same totals and distinct-user estimates for any chunk size.
+
+    The log has a few missing user ids, so some chunks read the id column with a different dtype.
+    """
+    rng = np.random.default_rng(seed)
+    user_ids = pd.array(rng.integers(1, users + 1, n), dtype="Int64")
+    user_ids[rng.choice(n, 5, replace=False)] = pd.NA
+    log = pd.DataFrame({
+        "timestamp": "2025-05-01", "platform": "Meta", "segment": "Sarah", "event": "impression",
+        "cost": 0.01, "user_id": user_ids,
+    })
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "log.csv")
+        log.to_csv(path, index=False)
+        results = [ingest_logs([path], chunk_size=chunk_size, workers=1) for chunk_size in (n, n // 10, 777)]
+    # Totals may differ in the last float bits from the summation order; the sketches must match exactly
+    first_daily, first_reach = results[0]
+    return all(
+        daily.index.equals(first_daily.index)
+        and np.allclose(daily.to_numpy(dtype=float), first_daily.to_numpy(dtype=float))
+        and reach.equals(first_reach)
+        for daily, reach in results[1:]
+    )
+
+
+def _time(function, repeat, min_seconds):
+    """
+    Returns the best wall time per run over ``repeat`` measurements.
+
+    Each measurement calls ``function`` until at least ``min_seconds`` have passed, so fast benchmarks
+    are averaged over many runs instead of being dominated by timer and scheduling noise.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        runs = 0
+        start = time.perf_counter()
+        while True:
+            function()
+            runs += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                break
+        best = min(best, elapsed / runs)
+    return best
+
+
+def _scalar_loop(function, columns, n):
+    arguments = list(zip(*(column[:n] for column in columns)))
+
+    def run():
+        for call_arguments in arguments:
+            function(*call_arguments)
+    return run
+
+
+def run_benchmarks(sizes=SIZES, repeat=5, scalar_limit=100_000, min_seconds=0.05):
+    """
+    Times every pipeline function at each size and returns one record per (benchmark, size).
+
+    Every benchmark is measured ``repeat`` times for at least ``min_seconds`` each (see _time). Inputs
+    are built beforehand, so only the calls themselves are timed. Scalar loops (calculate_target_audience
+    and the helper functions) are run up to ``scalar_limit`` calls and extrapolated beyond it, which
+    the ``extrapolated`` flag records.
+    """
+    records = []
+    helpers = generate_helper_inputs(min(max(sizes), scalar_limit))
+
+    def record(name, size, seconds, measured_size=None):
+        records.append({
+            "benchmark": name,
+            "size": size,
+            "seconds": seconds * size / (measured_size or size),
+            "per_item_us": seconds / (measured_size or size) * 1e6,
+            "extrapolated": measured_size is not None and measured_size != size,
+        })
+
+    for size in sizes:
+        scenarios = generate_scenarios(size)
+        timed = lambda function: _time(function, repeat, min_seconds)
+        record("calculate_target_audience_frame", size,
+               timed(lambda: calculate_target_audience_frame(scenarios, **BASE_INPUTS)))
+
+        measured = min(size, scalar_limit // 10)
+        arguments = scalar_inputs(scenarios.iloc[:measured])
+        record("calculate_target_audience", size,
+               timed(lambda: [calculate_target_audience(**inputs) for inputs in arguments]), measured)
+
+        splits = generate_audience_splits(max(size // len(CPM_RANGES), 1))
+        record("calculate_budget_cube", size, timed(lambda: calculate_budget_cube(splits, CPM_RANGES, 10, [None])))
+        record("calculate_budget", size, timed(lambda: calculate_budget(splits, CPM_RANGES, 10, [None])))
+        record("calculate_retargeting_budget", size, timed(
+            lambda: calculate_retargeting_budget(splits, RETARGETING_CPM, 10, [0.1, 0.25, 0.5])
+        ))
+
+        measured = min(size, scalar_limit)
+        record("calculate_cpm_budget", size, timed(_scalar_loop(
+            calculate_cpm_budget,
+            (helpers["audience_size"], helpers["impressions_per_user"], helpers["cpm"]), measured)), measured)
+        record("calculate_cpc_budget", size, timed(_scalar_loop(
+            calculate_cpc_budget, (helpers["clicks"], helpers["cpc"]), measured)), measured)
+        record("calculate_revenue", size, timed(_scalar_loop(
+            calculate_revenue,
+            (helpers["traffic"], helpers["conversion_rate"], helpers["avg_order_value"]), measured)), measured)
+        record("calculate_roas", size, timed(_scalar_loop(
+            calculate_roas, (helpers["traffic"], helpers["ad_spend"]), measured)), measured)
+
+    return records
+
+
+def compare(results, baseline, threshold=0.2):
+    """Returns the benchmarks that got slower than ``baseline`` by more than ``threshold`` (relative)."""
+    previous = {(entry["benchmark"], entry["size"]): entry["seconds"] for entry in baseline["results"]}
+    regressions = []
+    for entry in results["results"]:
+        key = (entry["benchmark"], entry["size"])
+        if key in previous and previous[key] > 0 and entry["seconds"] > previous[key] * (1 + threshold):
+            regressions.append({
+                "benchmark": entry["benchmark"],
+                "size": entry["size"],
+                "baseline_seconds": previous[key],
+                "seconds": entry["seconds"],
+                "change": entry["seconds"] / previous[key] - 1,
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the calculation pipeline. Set REGIOS_PROFILE=1 (or alloc) for hot-path statistics."
+    )
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05,
+                        help="minimum seconds per measurement; fast benchmarks are looped until it is reached")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10_000, 1_000_000],
+                        help="scenario counts for the scalar vs. batch comparison")
+    args = parser.parse_args(argv)
+
+    failures = check_golden()
+    profiling.reset()
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "profile_mode": profiling.PROFILE_MODE,
+        },
+        "golden": {"passed": not failures, "failures": failures},
+        "results": run_benchmarks(args.sizes, args.repeat, min_seconds=args.min_time),
+        "batch_speedup": benchmark_target_audience_batch(args.batch_sizes).to_dict("records"),
+        "profile": profiling.report(),
+    }
+
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(results, handle, indent=2)
+
+    print(pd.DataFrame(results["results"]).to_string(index=False))
+    print("\nScalar vs. batch calculate_target_audience:")
+    print(pd.DataFrame(results["batch_speedup"]).to_string(index=False))
+    print(f"\nGolden values: {'passed' if not failures else 'FAILED: ' + ', '.join(failures)}")
+    mismatches = sum(row["mismatches"] for row in results["batch_speedup"])
+    if mismatches:
+        print(f"Batch results differ from the scalar version in {mismatches} scenarios")
+    status = 0 if not failures and not mismatches else 1
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            print(pd.DataFrame(regressions).to_string(index=False))
+            status = 1
+        else:
+            print(f"\nNo regressions beyond {args.threshold:.0%} against {args.compare}")
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
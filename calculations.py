@@ -2,7 +2,73 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
+from profiling import hot_path
 
+
+def _reach_factor(social_media_usage):
+    """
+    Share of a segment reached on at least one platform.
+
+    Usage dicts of per-platform rates assume independent platforms (``1 - prod(1 - p)``; the rates may
+    be arrays with one entry per scenario); a JointUsage (see overlap.py) gives the exact deduplicated
+    reach from joint usage data instead.
+    """
+    if hasattr(social_media_usage, "reach"):
+        if getattr(social_media_usage, "segments", None) is not None:
+            raise ValueError(
+                "This JointUsage holds one distribution per segment; pass a single one with .segment(name)"
+            )
+        return np.asarray(social_media_usage.reach(), dtype=float)
+    product = 1.0
+    for p in social_media_usage.values():
+        product = product * (1 - np.asarray(p, dtype=float))
+    return 1 - product
+
+
+def _austrian_citizens(total_population, foreign_percentage):
+    foreign_population = total_population * (foreign_percentage / 100)
+    return total_population - foreign_population
+
+
+def _age_group_population(austrian_citizens, age_distribution, national_population):
+    return {age: pop * (austrian_citizens / national_population) for age, pop in age_distribution.items()}
+
+
+def _homeowners_by_age(age_group_population, homeownership_rates):
+    return {age: population * homeownership_rates[age] for age, population in age_group_population.items()}
+
+
+def _homeowners_higher_ed(homeowners_by_age, education_rate):
+    return {age: homeowners * education_rate for age, homeowners in homeowners_by_age.items()}
+
+
+def _segment_populations(homeowners_by_age, homeowners_higher_ed):
+    """Sums the homeowners into the Sarah (30-39) and Non-Sarah segments, with and without higher education."""
+    return {
+        "Sarah": homeowners_by_age["30-34"] + homeowners_by_age["35-39"],
+        "Non_Sarah": sum(
+            homeowners_by_age[age] for age in homeowners_by_age.keys() if age not in ["30-34", "35-39"]
+        ),
+        "Sarah_Higher_Ed": homeowners_higher_ed["30-34"] + homeowners_higher_ed["35-39"],
+        "Non_Sarah_Higher_Ed": sum(
+            homeowners_higher_ed[age] for age in homeowners_higher_ed.keys() if age not in ["30-34", "35-39"]
+        ),
+    }
+
+
+def _effective_reach(segments, sarah_reach_share, non_sarah_reach_share, margin_of_errors):
+    """Applies the reach shares to the segments and combines the margins of error into the final results."""
+    combined_margin_of_error = np.sqrt(sum([error ** 2 for error in margin_of_errors.values()]))
+    return {
+        "Sarah_Effective_Reach": round(segments["Sarah"] * sarah_reach_share),
+        "Non_Sarah_Effective_Reach": round(segments["Non_Sarah"] * non_sarah_reach_share),
+        "Sarah_Effective_Reach_Higher_Ed": round(segments["Sarah_Higher_Ed"] * sarah_reach_share),
+        "Non_Sarah_Effective_Reach_Higher_Ed": round(segments["Non_Sarah_Higher_Ed"] * non_sarah_reach_share),
+        "Margin_of_Error": round(combined_margin_of_error, 2)
+    }
+
+
+@hot_path
 def calculate_target_audience(
         total_population,
         foreign_percentage,
@@ -11,100 +77,287 @@ def calculate_target_audience(
         education_rate,
         social_media_usage_sarah,
         social_media_usage_non_sarah,
-        margin_of_errors
+        margin_of_errors,
+        national_population=9000000
 ):
     """
     Calculates the effective reach for different target audience segments based on given statistical inputs.
+
+    Each step is a separate helper, so the what-if server (server.py) can cache them individually.
     """
 
     # Step 1: Remove foreign nationals
-    foreign_population = total_population * (foreign_percentage / 100)
-    austrian_citizens = total_population - foreign_population
+    austrian_citizens = _austrian_citizens(total_population, foreign_percentage)
 
     # Step 2: Estimate target age groups in Freistadt based on national distribution
-    age_group_population = {
-        age: pop * (austrian_citizens / 9000000) for age, pop in age_distribution.items()
-    }
+    age_group_population = _age_group_population(austrian_citizens, age_distribution, national_population)
 
     # Step 3: Apply homeownership filter
-    homeowners_by_age = {
-        age: age_group_population[age] * homeownership_rates[age]
-        for age in age_distribution.keys()
-    }
-    total_homeowners = sum(homeowners_by_age.values())
+    homeowners_by_age = _homeowners_by_age(age_group_population, homeownership_rates)
 
     # Step 4: Apply education filter
-    homeowners_higher_ed = {
-        age: homeowners_by_age[age] * education_rate for age in homeowners_by_age.keys()
+    homeowners_higher_ed = _homeowners_higher_ed(homeowners_by_age, education_rate)
+
+    # Step 5: Define segments
+    segments = _segment_populations(homeowners_by_age, homeowners_higher_ed)
+
+    # Step 6-7: Calculate social media reach and the final margin of error
+    sarah_reach_share = _reach_factor(social_media_usage_sarah)
+    non_sarah_reach_share = _reach_factor(social_media_usage_non_sarah)
+    return _effective_reach(segments, sarah_reach_share, non_sarah_reach_share, margin_of_errors)
+
+
+SARAH_AGE_GROUPS = ("30-34", "35-39")
+
+
+def _segment_sum(values_by_age, include):
+    """Sums per-age arrays in dict order, mirroring the scalar ``sum(...)`` so results stay bit-identical."""
+    total = 0
+    for age, values in values_by_age.items():
+        if (age in SARAH_AGE_GROUPS) == include:
+            total = total + values
+    return total
+
+
+@hot_path
+def calculate_target_audience_batch(
+        total_population,
+        foreign_percentage,
+        age_distribution,
+        homeownership_rates,
+        education_rate,
+        social_media_usage_sarah,
+        social_media_usage_non_sarah,
+        margin_of_errors,
+        national_population=9000000
+):
+    """
+    Vectorized version of calculate_target_audience for whole parameter grids.
+
+    Takes the same arguments, but every scalar and every dict value may be an array with one entry per
+    scenario; all inputs are broadcast against each other. ``national_population`` is the population the
+    age counts refer to; pass 1 to give the age distribution as shares of the citizens instead. Returns a
+    DataFrame with one row per scenario holding the rounded effective reaches (identical to the scalar
+    function) and the unrounded segment populations.
+    """
+    total_population = np.asarray(total_population, dtype=float)
+    foreign_percentage = np.asarray(foreign_percentage, dtype=float)
+    education_rate = np.asarray(education_rate, dtype=float)
+
+    # Step 1: Remove foreign nationals
+    foreign_population = total_population * (foreign_percentage / 100)
+    austrian_citizens = total_population - foreign_population
+
+    # Step 2-4: Scale national age counts, apply homeownership and education filters
+    scale = austrian_citizens / np.asarray(national_population, dtype=float)
+    homeowners_by_age = {
+        age: (np.asarray(pop, dtype=float) * scale) * np.asarray(homeownership_rates[age], dtype=float)
+        for age, pop in age_distribution.items()
     }
+    homeowners_higher_ed = {age: homeowners * education_rate for age, homeowners in homeowners_by_age.items()}
 
     # Step 5: Define segments
     sarah_population = homeowners_by_age["30-34"] + homeowners_by_age["35-39"]
-    non_sarah_population = sum(
-        homeowners_by_age[age] for age in homeowners_by_age.keys() if age not in ["30-34", "35-39"]
+    non_sarah_population = _segment_sum(homeowners_by_age, include=False)
+    sarah_population_higher_ed = homeowners_higher_ed["30-34"] + homeowners_higher_ed["35-39"]
+    non_sarah_population_higher_ed = _segment_sum(homeowners_higher_ed, include=False)
+
+    # Step 6: Calculate social media reach
+    sarah_factor = _reach_factor(social_media_usage_sarah)
+    non_sarah_factor = _reach_factor(social_media_usage_non_sarah)
+
+    columns = {
+        "Sarah_Effective_Reach": sarah_population * sarah_factor,
+        "Non_Sarah_Effective_Reach": non_sarah_population * non_sarah_factor,
+        "Sarah_Effective_Reach_Higher_Ed": sarah_population_higher_ed * sarah_factor,
+        "Non_Sarah_Effective_Reach_Higher_Ed": non_sarah_population_higher_ed * non_sarah_factor,
+    }
+
+    # Step 7: Compute final margin of error (round() on a NumPy float is np.round, so this matches exactly)
+    combined_margin_of_error = np.round(
+        np.sqrt(sum([np.asarray(error, dtype=float) ** 2 for error in margin_of_errors.values()])), 2
     )
 
-    sarah_population_higher_ed = homeowners_higher_ed["30-34"] + homeowners_higher_ed["35-39"]
-    non_sarah_population_higher_ed = sum(
-        homeowners_higher_ed[age] for age in homeowners_higher_ed.keys() if age not in ["30-34", "35-39"]
+    populations = {
+        "Sarah_Population": sarah_population,
+        "Non_Sarah_Population": non_sarah_population,
+        "Sarah_Population_Higher_Ed": sarah_population_higher_ed,
+        "Non_Sarah_Population_Higher_Ed": non_sarah_population_higher_ed,
+    }
+    shape = np.broadcast_shapes(
+        (1,), np.shape(combined_margin_of_error), *(np.shape(values) for values in populations.values()),
+        *(np.shape(values) for values in columns.values())
     )
 
-    # Step 6: Calculate social media reach
-    effective_sarah_reach = sarah_population * (1 - np.prod([1 - p for p in social_media_usage_sarah.values()]))
-    effective_non_sarah_reach = non_sarah_population * (
-                1 - np.prod([1 - p for p in social_media_usage_non_sarah.values()]))
+    results = {key: np.broadcast_to(np.rint(values), shape).astype(np.int64) for key, values in columns.items()}
+    results["Margin_of_Error"] = np.broadcast_to(combined_margin_of_error, shape).astype(float)
+    results.update({key: np.broadcast_to(values, shape).astype(float) for key, values in populations.items()})
 
-    effective_sarah_reach_higher_ed = sarah_population_higher_ed * (
-                1 - np.prod([1 - p for p in social_media_usage_sarah.values()]))
-    effective_non_sarah_reach_higher_ed = non_sarah_population_higher_ed * (
-                1 - np.prod([1 - p for p in social_media_usage_non_sarah.values()]))
+    return pd.DataFrame(results)
 
-    # Step 7: Compute final margin of error (weighted combination of input errors)
-    combined_margin_of_error = np.sqrt(sum([error ** 2 for error in margin_of_errors.values()]))
 
-    # Output results
-    results = {
-        "Sarah_Effective_Reach": round(effective_sarah_reach),
-        "Non_Sarah_Effective_Reach": round(effective_non_sarah_reach),
-        "Sarah_Effective_Reach_Higher_Ed": round(effective_sarah_reach_higher_ed),
-        "Non_Sarah_Effective_Reach_Higher_Ed": round(effective_non_sarah_reach_higher_ed),
-        "Margin_of_Error": round(combined_margin_of_error, 2)
+SCENARIO_COLUMNS = {
+    "National Population": "national_population",
+    "Total Population": "total_population",
+    "Foreign Percentage": "foreign_percentage",
+    "Higher Education Rate": "education_rate",
+}
+SCENARIO_COLUMN_PREFIXES = {
+    "Age ": "age_distribution",
+    "Homeownership ": "homeownership_rates",
+    "Usage Sarah ": "social_media_usage_sarah",
+    "Usage Non-Sarah ": "social_media_usage_non_sarah",
+    "Margin of Error ": "margin_of_errors",
+}
+
+
+def scenario_arguments(scenarios, **defaults):
+    """
+    Turns a scenario DataFrame (one row per scenario) into keyword arguments for calculate_target_audience_batch.
+
+    Columns use the same names as the Demographics sheet ("Total Population", "Foreign Percentage",
+    "Higher Education Rate", "Age 30-34", "Homeownership 30-34", ...) plus "Usage Sarah <platform>",
+    "Usage Non-Sarah <platform>", "Margin of Error <category>" and "National Population". Anything not
+    covered by a column is taken from ``defaults``, which use the scalar argument names. Other columns are
+    ignored.
+    """
+    arguments = {
+        "total_population": defaults.get("total_population"),
+        "foreign_percentage": defaults.get("foreign_percentage"),
+        "education_rate": defaults.get("education_rate"),
+        "age_distribution": dict(defaults.get("age_distribution") or {}),
+        "homeownership_rates": dict(defaults.get("homeownership_rates") or {}),
+        "social_media_usage_sarah": dict(defaults.get("social_media_usage_sarah") or {}),
+        "social_media_usage_non_sarah": dict(defaults.get("social_media_usage_non_sarah") or {}),
+        "margin_of_errors": dict(defaults.get("margin_of_errors") or {}),
+        "national_population": defaults.get("national_population", 9000000),
     }
 
+    for column in scenarios.columns:
+        if column in SCENARIO_COLUMNS:
+            arguments[SCENARIO_COLUMNS[column]] = scenarios[column].to_numpy(dtype=float)
+            continue
+        for prefix, argument in SCENARIO_COLUMN_PREFIXES.items():
+            if column.startswith(prefix):
+                arguments[argument][column[len(prefix):]] = scenarios[column].to_numpy(dtype=float)
+                break
+
+    missing = [name for name, value in arguments.items() if value is None]
+    if missing:
+        raise ValueError(f"Missing scenario inputs: {', '.join(missing)}")
+
+    return arguments
+
+
+def calculate_target_audience_frame(scenarios, **defaults):
+    """Runs calculate_target_audience_batch over a scenario DataFrame; see scenario_arguments for column names."""
+    results = calculate_target_audience_batch(**scenario_arguments(scenarios, **defaults))
+    if len(results) != len(scenarios):
+        # No input column varies per row, so the single result applies to every scenario
+        results = results.iloc[np.zeros(len(scenarios), dtype=np.intp)]
+    results.index = scenarios.index
     return results
 
 
+def calculate_audience_splits(audience_results, total_population):
+    """Splits the population into the audiences used for budgeting (works on scalar and batch results)."""
+    sarah_higher_ed = audience_results["Sarah_Effective_Reach_Higher_Ed"]
+    non_sarah_higher_ed = audience_results["Non_Sarah_Effective_Reach_Higher_Ed"]
+    return {
+        "Sarah (höhere Bildung)": sarah_higher_ed,
+        "Nicht-Sarah (höhere Bildung)": non_sarah_higher_ed,
+        "Alle ohne höhere Bildung": total_population - sarah_higher_ed - non_sarah_higher_ed
+    }
+
+
+BUDGET_CUBE_LEVELS = ["Platform", "Audience", "Month", "Frequency", "Interest Level"]
+
+
+def _budget_arrays(sizes, cpm_ranges, frequencies, levels, season):
+    """Returns impressions and the rounded min/expected/max budgets on platform × audience × month × frequency × level axes."""
+    cpm = np.asarray(cpm_ranges, dtype=float).reshape(-1, 2)
+    adjusted_sizes = (sizes[:, None, None, None] * levels[None, None, None, :]) * season[None, :, None, None]
+    impressions = adjusted_sizes * frequencies[None, None, :, None]
+    thousands = (impressions / 1000)[None]
+    cpm_min = cpm[:, 0].reshape(-1, 1, 1, 1, 1)
+    cpm_max = cpm[:, 1].reshape(-1, 1, 1, 1, 1)
+    return (
+        np.broadcast_to(impressions, (len(cpm),) + impressions.shape),
+        np.rint(thousands * cpm_min).astype(np.int64),
+        np.rint(thousands * ((cpm_min + cpm_max) / 2)).astype(np.int64),
+        np.rint(thousands * cpm_max).astype(np.int64),
+    )
+
+
+@hot_path
+def calculate_budget_cube(
+        adjusted_target_audience_splits, cpm_ranges, ad_frequency_per_month, months,
+        interest_levels=(1.0,), seasonality=None
+):
+    """
+    Calculates the advertising budget for every platform × audience × month × frequency × interest level.
+
+    ``ad_frequency_per_month`` may be a single frequency or a sequence of frequencies to compare,
+    ``interest_levels`` scales the audience (1.0 = full audience, as for prospecting), and
+    ``seasonality`` optionally gives a multiplier per month. The whole cube is computed in one
+    broadcast NumPy pass and returned as a DataFrame indexed by BUDGET_CUBE_LEVELS with the columns
+    Impressions, Min, Expected and Max, so it can be sliced with ``.xs`` or aggregated with ``groupby``.
+    """
+    platforms = list(cpm_ranges)
+    audiences = list(adjusted_target_audience_splits)
+    months = list(months)
+    frequencies = np.atleast_1d(np.asarray(ad_frequency_per_month, dtype=float))
+    levels = np.atleast_1d(np.asarray(interest_levels, dtype=float))
+    season = np.ones(len(months)) if seasonality is None else np.asarray(seasonality, dtype=float)
+    if season.shape != (len(months),):
+        raise ValueError("seasonality must give one multiplier per month")
+
+    sizes = np.asarray([adjusted_target_audience_splits[audience] for audience in audiences], dtype=float)
+    impressions, min_budget, expected_budget, max_budget = _budget_arrays(
+        sizes, [cpm_ranges[platform] for platform in platforms], frequencies, levels, season
+    )
+
+    index = pd.MultiIndex.from_product(
+        [platforms, audiences, months, frequencies.tolist(), levels.tolist()], names=BUDGET_CUBE_LEVELS
+    )
+    return pd.DataFrame({
+        "Impressions": impressions.ravel(),
+        "Min": min_budget.ravel(),
+        "Expected": expected_budget.ravel(),
+        "Max": max_budget.ravel(),
+    }, index=index)
+
+
+@hot_path
 def calculate_budget(
         adjusted_target_audience_splits, cpm_ranges, ad_frequency_per_month, months
 ):
     """Calculates the advertising budget per month for each platform and target group."""
-    monthly_budget_summary = {}
-
-    for platform, (cpm_min, cpm_max) in cpm_ranges.items():
-        for audience, size in adjusted_target_audience_splits.items():
-            min_budget = round((size * ad_frequency_per_month / 1000) * cpm_min)
-            expected_budget = round((size * ad_frequency_per_month / 1000) * ((cpm_min + cpm_max) / 2))
-            max_budget = round((size * ad_frequency_per_month / 1000) * cpm_max)
-            monthly_budget_summary[f"{platform} - {audience}"] = (min_budget, expected_budget, max_budget)
-
-    return monthly_budget_summary
+    # Built from the cube's arrays directly; a DataFrame would dominate the cost for a handful of entries
+    sizes = np.asarray(list(adjusted_target_audience_splits.values()), dtype=float)
+    _, min_budget, expected_budget, max_budget = _budget_arrays(
+        sizes, list(cpm_ranges.values()), np.asarray([ad_frequency_per_month], dtype=float), np.ones(1), np.ones(1)
+    )
+    budgets = zip(min_budget.ravel().tolist(), expected_budget.ravel().tolist(), max_budget.ravel().tolist())
+    keys = [f"{platform} - {audience}" for platform in cpm_ranges for audience in adjusted_target_audience_splits]
+    return dict(zip(keys, budgets))
 
 
+@hot_path
 def calculate_retargeting_budget(
         adjusted_target_audience_splits, cpm_values, ad_frequency_per_month, interest_levels
 ):
     """Calculates the retargeting budget for different interest scenarios."""
-    retargeting_budget_summary = {}
-
-    for level in interest_levels:
-        retargeting_budget_summary[level] = {}
-        for platform, avg_cpm in cpm_values.items():
-            for audience, size in adjusted_target_audience_splits.items():
-                adjusted_size = size * level
-                budget = round((adjusted_size * ad_frequency_per_month / 1000) * avg_cpm)
-                retargeting_budget_summary[level][f"{platform} - {audience}"] = budget
-
-    return retargeting_budget_summary
+    sizes = np.asarray(list(adjusted_target_audience_splits.values()), dtype=float)
+    _, _, budget, _ = _budget_arrays(
+        sizes, [(avg_cpm, avg_cpm) for avg_cpm in cpm_values.values()],
+        np.asarray([ad_frequency_per_month], dtype=float), np.asarray(interest_levels, dtype=float), np.ones(1)
+    )
+    keys = [f"{platform} - {audience}" for platform in cpm_values for audience in adjusted_target_audience_splits]
+    return {
+        level: dict(zip(keys, budget[..., position].ravel().tolist()))
+        for position, level in enumerate(interest_levels)
+    }
 
 
 # Placeholder function for Google Looker API connection
@@ -118,25 +371,49 @@ if __name__ == "__main__":
     print("This script contains functions for audience estimation, budget calculation, and retargeting analysis.")
     print("It also includes a Google Looker API placeholder for future data integration.")
 
+@hot_path
 def calculate_cpm_budget(audience_size, impressions_per_user, cpm):
     """Calculates total budget required for CPM-based advertising."""
     total_impressions = audience_size * impressions_per_user
     budget = (total_impressions / 1000) * cpm
     return round(budget, 2)
 
+@hot_path
 def calculate_cpc_budget(estimated_clicks, cpc):
     """Calculates total budget required for CPC-based advertising."""
     budget = estimated_clicks * cpc
     return round(budget, 2)
 
+@hot_path
 def calculate_revenue(traffic, conversion_rate, avg_order_value):
     """Calculates estimated revenue based on traffic, conversion rate, and order value."""
     conversions = traffic * conversion_rate
     revenue = conversions * avg_order_value
     return round(revenue, 2)
 
+def _safe_ratio(numerator, denominator, scale=1):
+    """Divides element-wise, returning 0 where the denominator is 0."""
+    denominator = np.asarray(denominator, dtype=float)
+    numerator = np.asarray(numerator, dtype=float) * scale
+    ratio = np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                      where=denominator != 0)
+    return np.round(ratio, 2)
+
+@hot_path
 def calculate_roas(revenue, ad_spend):
-    """Calculates the Return on Ad Spend (ROAS)."""
+    """Calculates the Return on Ad Spend (ROAS). Also accepts arrays, with 0 where there was no spend."""
+    if np.ndim(ad_spend):
+        return _safe_ratio(revenue, ad_spend)
     if ad_spend == 0:
         return 0
     return round(revenue / ad_spend, 2)
+
+@hot_path
+def calculate_realized_cpm(ad_spend, impressions):
+    """Calculates the realized cost per thousand impressions (element-wise for arrays, 0 without impressions)."""
+    return _safe_ratio(ad_spend, impressions, scale=1000)
+
+@hot_path
+def calculate_realized_cpc(ad_spend, clicks):
+    """Calculates the realized cost per click (element-wise for arrays, 0 without clicks)."""
+    return _safe_ratio(ad_spend, clicks)
@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+import xml.etree.ElementTree as ElementTree
+import zipfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+MANIFEST = "manifest.json"
+CACHE_VERSION = 2
+RELATIONSHIP_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+# Cell kinds of object columns, which can mix numbers and text
+MISSING, INTEGER, FLOAT, BOOLEAN, TEXT, TIMESTAMP = range(6)
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sheet_fingerprints(file_path):
+    """
+    Hashes each worksheet of an .xlsx workbook without parsing the cell data.
+
+    Numeric cells live in the worksheet XML itself, but text cells point into the shared string table,
+    so every fingerprint also covers that table. Returns None for files that are not .xlsx archives.
+    """
+    if not zipfile.is_zipfile(file_path):
+        return None
+
+    with zipfile.ZipFile(file_path) as archive:
+        names = set(archive.namelist())
+        workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        relationships = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        shared_strings = archive.read("xl/sharedStrings.xml") if "xl/sharedStrings.xml" in names else b""
+        targets = {
+            relationship.get("Id"): relationship.get("Target") for relationship in relationships
+        }
+
+        fingerprints = {}
+        for sheet in workbook.iter():
+            if not sheet.tag.endswith("}sheet"):
+                continue
+            target = targets[sheet.get(RELATIONSHIP_ID)]
+            member = target.lstrip("/") if target.startswith("/") else posixpath.normpath(f"xl/{target}")
+            fingerprints[sheet.get("name")] = _digest(archive.read(member) + shared_strings)
+
+    return fingerprints
+
+
+class ConstantsStore:
+    """
+    Loads the sheets of the constants workbook through a binary cache.
+
+    The first load parses the workbook and stores every column as a ``.npy`` file next to a manifest
+    keyed by the workbook's mtime, size and hash. Later loads memory-map those files instead of parsing
+    Excel again. When the workbook changes, only sheets whose content changed are parsed again.
+
+    Columns with a single dtype are stored as one array. Object columns, which may mix numbers and
+    text, are stored per cell as a kind code plus a numeric and a text array, so every cell comes back
+    with the type ``pd.read_excel`` gives it.
+    """
+
+    def __init__(self, file_path, cache_dir=None):
+        self.file_path = file_path
+        if cache_dir is None:
+            directory, name = os.path.split(os.path.abspath(file_path))
+            cache_dir = os.path.join(directory, f".{name}.cache")
+        self.cache_dir = cache_dir
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.cache_dir, MANIFEST), encoding="utf-8") as handle:
+                manifest = json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return None
+        if manifest.get("version") != CACHE_VERSION:
+            for entry in manifest.get("sheets", {}).values():
+                self._remove_sheet(entry)
+            return None
+        return manifest
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, MANIFEST)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def _sheet_prefix(self, sheet):
+        return re.sub(r"[^A-Za-z0-9_-]", "_", sheet) + "-" + _digest(sheet.encode("utf-8"))[:8]
+
+    def _save(self, file_name, array):
+        np.save(os.path.join(self.cache_dir, file_name), array, allow_pickle=False)
+        return file_name
+
+    def _write_sheet(self, sheet, frame):
+        prefix = self._sheet_prefix(sheet)
+        columns = []
+        for position, column in enumerate(frame.columns):
+            values = frame[column]
+            name = column if isinstance(column, (int, float)) else str(column)
+            if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values) \
+                    or pd.api.types.is_datetime64_any_dtype(values):
+                columns.append({"name": name, "file": self._save(f"{prefix}-{position}.npy", values.to_numpy())})
+                continue
+
+            kinds = np.full(len(values), TEXT, dtype=np.int8)
+            numbers = np.zeros(len(values))
+            text = [""] * len(values)
+            for row, value in enumerate(values.tolist()):
+                if isinstance(value, (bool, np.bool_)):
+                    kinds[row], numbers[row] = BOOLEAN, value
+                elif isinstance(value, (int, np.integer)):
+                    kinds[row], numbers[row] = INTEGER, value
+                elif isinstance(value, (float, np.floating)):
+                    kinds[row], numbers[row] = (MISSING, 0) if np.isnan(value) else (FLOAT, value)
+                elif value is None or value is pd.NaT:
+                    kinds[row] = MISSING
+                elif isinstance(value, datetime):
+                    kinds[row], text[row] = TIMESTAMP, value.isoformat()
+                else:
+                    text[row] = str(value)
+            columns.append({"name": name, "dtype": str(values.dtype), "files": {
+                "kinds": self._save(f"{prefix}-{position}-kinds.npy", kinds),
+                "numbers": self._save(f"{prefix}-{position}-numbers.npy", numbers),
+                "text": self._save(f"{prefix}-{position}-text.npy", np.asarray(text, dtype=str)),
+            }})
+        return columns
+
+    def _load(self, file_name):
+        return np.load(os.path.join(self.cache_dir, file_name), mmap_mode="r")
+
+    def _read_column(self, column):
+        if "file" in column:
+            return self._load(column["file"])
+        kinds = self._load(column["files"]["kinds"])
+        numbers = self._load(column["files"]["numbers"])
+        text = self._load(column["files"]["text"])
+        converters = {
+            MISSING: lambda row: np.nan,
+            INTEGER: lambda row: int(numbers[row]),
+            FLOAT: lambda row: float(numbers[row]),
+            BOOLEAN: lambda row: bool(numbers[row]),
+            TEXT: lambda row: str(text[row]),
+            TIMESTAMP: lambda row: datetime.fromisoformat(str(text[row])),
+        }
+        values = np.empty(len(kinds), dtype=object)
+        values[:] = [converters[kind](row) for row, kind in enumerate(kinds.tolist())]
+        return values if column["dtype"] == "object" else pd.array(values, dtype=column["dtype"])
+
+    def _read_sheet(self, entry):
+        # copy=False keeps the numeric columns backed by the memory-mapped files
+        return pd.DataFrame({column["name"]: self._read_column(column) for column in entry["columns"]}, copy=False)
+
+    def _remove_sheet(self, entry):
+        for column in entry["columns"]:
+            for file_name in column["files"].values() if "files" in column else [column["file"]]:
+                try:
+                    os.remove(os.path.join(self.cache_dir, file_name))
+                except FileNotFoundError:
+                    pass
+
+    def load(self):
+        """Returns all sheets of the workbook as a dict of DataFrames, like ``pd.read_excel(sheet_name=None)``."""
+        stat = os.stat(self.file_path)
+        manifest = self._read_manifest()
+
+        if manifest and manifest["mtime_ns"] == stat.st_mtime_ns and manifest["size"] == stat.st_size:
+            return {sheet: self._read_sheet(entry) for sheet, entry in manifest["sheets"].items()}
+
+        file_hash = _file_digest(self.file_path)
+        if manifest and manifest["sha256"] == file_hash:
+            manifest.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            self._write_manifest(manifest)
+            return {sheet: self._read_sheet(entry) for sheet, entry in manifest["sheets"].items()}
+
+        cached = manifest["sheets"] if manifest else {}
+        fingerprints = sheet_fingerprints(self.file_path)
+        if fingerprints is None:
+            stale = None
+        else:
+            stale = [
+                sheet for sheet, fingerprint in fingerprints.items()
+                if cached.get(sheet, {}).get("fingerprint") != fingerprint
+            ]
+        parsed = pd.read_excel(self.file_path, sheet_name=stale) if stale is None or stale else {}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        sheets = {}
+        for sheet in parsed if fingerprints is None else fingerprints:
+            if sheet in parsed:
+                if sheet in cached:
+                    self._remove_sheet(cached[sheet])
+                sheets[sheet] = {
+                    "fingerprint": fingerprints[sheet] if fingerprints else None,
+                    "columns": self._write_sheet(sheet, parsed[sheet]),
+                }
+            else:
+                sheets[sheet] = cached[sheet]
+        for sheet, entry in cached.items():
+            if sheet not in sheets:
+                self._remove_sheet(entry)
+
+        self._write_manifest({
+            "version": CACHE_VERSION, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": file_hash, "sheets": sheets,
+        })
+        return {sheet: self._read_sheet(entry) for sheet, entry in sheets.items()}
+
+    def verify(self):
+        """Loads the workbook through the cache and returns the sheets that differ from ``pd.read_excel``."""
+        cached = self.load()
+        parsed = pd.read_excel(self.file_path, sheet_name=None)
+        mismatches = sorted(set(cached) ^ set(parsed))
+        for sheet in set(cached) & set(parsed):
+            try:
+                # A deep copy turns the memory-mapped columns into plain arrays for the comparison
+                pd.testing.assert_frame_equal(cached[sheet].copy(deep=True), parsed[sheet], check_exact=True)
+            except AssertionError:
+                mismatches.append(sheet)
+        return mismatches
+
+
+if __name__ == "__main__":
+    import sys
+
+    mismatches = ConstantsStore(sys.argv[1] if len(sys.argv) > 1 else "constants.xlsx").verify()
+    print("Cache matches the workbook" if not mismatches else f"Cache differs in: {', '.join(mismatches)}")
+    sys.exit(1 if mismatches else 0)
@@ -1,75 +1,65 @@
-import pandas as pd
-from calculations import calculate_target_audience, calculate_budget
+from datetime import datetime, timedelta
+
+from calculations import calculate_target_audience, calculate_budget_cube, calculate_audience_splits
+from constants import ConstantsStore
+
+
+def _sheet_to_dict(sheets, sheet_name, key_column, value_column):
+    sheet = sheets.get(sheet_name)
+    if sheet is None or sheet.empty:
+        return {}
+    return sheet.set_index(key_column)[value_column].to_dict()
 
 
 def load_constants_from_excel(file_path):
     """Loads constants such as population data, social media usage, etc. from an Excel spreadsheet, with fallback defaults."""
     try:
-        df = pd.read_excel(file_path, sheet_name=None)
-
-        demographics = df.get('Demographics', pd.DataFrame()).set_index('Category')['Value'].to_dict()
-        social_media_usage_sarah = df.get('Social_Media_Usage_Sarah', pd.DataFrame()).set_index('Platform')[
-            'Usage'].to_dict()
-        social_media_usage_non_sarah = df.get('Social_Media_Usage_Non_Sarah', pd.DataFrame()).set_index('Platform')[
-            'Usage'].to_dict()
-        margin_of_errors = df.get('Margin_of_Error', pd.DataFrame()).set_index('Category')['Value'].to_dict()
-
-    except Exception as e:
+        sheets = ConstantsStore(file_path).load()
+    except FileNotFoundError:
         print("Warning: Could not load Excel file. Using default values.")
-        demographics = {}
-        social_media_usage_sarah = {}
-        social_media_usage_non_sarah = {}
-        margin_of_errors = {}
-
-    return demographics, social_media_usage_sarah, social_media_usage_non_sarah, margin_of_errors
+        sheets = {}
 
+    demographics = _sheet_to_dict(sheets, 'Demographics', 'Category', 'Value')
+    social_media_usage_sarah = _sheet_to_dict(sheets, 'Social_Media_Usage_Sarah', 'Platform', 'Usage')
+    social_media_usage_non_sarah = _sheet_to_dict(sheets, 'Social_Media_Usage_Non_Sarah', 'Platform', 'Usage')
+    margin_of_errors = _sheet_to_dict(sheets, 'Margin_of_Error', 'Category', 'Value')
 
-# Load constants from external spreadsheet, fallback to defaults
-file_path = "constants.xlsx"  # Update with actual file path
-demographics, social_media_usage_sarah, social_media_usage_non_sarah, margin_of_errors = load_constants_from_excel(
-    file_path)
+    return demographics, social_media_usage_sarah, social_media_usage_non_sarah, margin_of_errors
 
 
 def get_value(data_dict, key, default):
     return data_dict.get(key, default)
 
 
-# Default values if missing in the Excel file
-total_population = get_value(demographics, 'Total Population', 72462)
-foreign_percentage = get_value(demographics, 'Foreign Percentage', 3.6)
+def build_audience_inputs(demographics, social_media_usage_sarah, social_media_usage_non_sarah, margin_of_errors):
+    """Builds the calculate_target_audience arguments, with default values if missing in the Excel file."""
+    return {
+        "total_population": get_value(demographics, 'Total Population', 72462),
+        "foreign_percentage": get_value(demographics, 'Foreign Percentage', 3.6),
+        "age_distribution": {
+            "30-34": get_value(demographics, 'Age 30-34', 321471 + 307544),
+            "35-39": get_value(demographics, 'Age 35-39', 318121 + 308328),
+            "40-44": get_value(demographics, 'Age 40-44', 312960 + 308711),
+            "45-49": get_value(demographics, 'Age 45-49', 289004 + 289029),
+            "50-54": get_value(demographics, 'Age 50-54', 317491 + 324150),
+            "55-59": get_value(demographics, 'Age 55-59', 357812 + 358600),
+            "60-64": get_value(demographics, 'Age 60-64', 330858 + 338782),
+        },
+        "homeownership_rates": {
+            "30-34": get_value(demographics, 'Homeownership 30-34', 0.35),
+            "35-39": get_value(demographics, 'Homeownership 35-39', 0.50),
+            "40-44": get_value(demographics, 'Homeownership 40-44', 0.60),
+            "45-49": get_value(demographics, 'Homeownership 45-49', 0.70),
+            "50-54": get_value(demographics, 'Homeownership 50-54', 0.75),
+            "55-59": get_value(demographics, 'Homeownership 55-59', 0.80),
+            "60-64": get_value(demographics, 'Homeownership 60-64', 0.85),
+        },
+        "education_rate": get_value(demographics, 'Higher Education Rate', 0.304),
+        "social_media_usage_sarah": social_media_usage_sarah,
+        "social_media_usage_non_sarah": social_media_usage_non_sarah,
+        "margin_of_errors": margin_of_errors,
+    }
 
-age_distribution = {
-    "30-34": get_value(demographics, 'Age 30-34', 321471 + 307544),
-    "35-39": get_value(demographics, 'Age 35-39', 318121 + 308328),
-    "40-44": get_value(demographics, 'Age 40-44', 312960 + 308711),
-    "45-49": get_value(demographics, 'Age 45-49', 289004 + 289029),
-    "50-54": get_value(demographics, 'Age 50-54', 317491 + 324150),
-    "55-59": get_value(demographics, 'Age 55-59', 357812 + 358600),
-    "60-64": get_value(demographics, 'Age 60-64', 330858 + 338782),
-}
-
-homeownership_rates = {
-    "30-34": get_value(demographics, 'Homeownership 30-34', 0.35),
-    "35-39": get_value(demographics, 'Homeownership 35-39', 0.50),
-    "40-44": get_value(demographics, 'Homeownership 40-44', 0.60),
-    "45-49": get_value(demographics, 'Homeownership 45-49', 0.70),
-    "50-54": get_value(demographics, 'Homeownership 50-54', 0.75),
-    "55-59": get_value(demographics, 'Homeownership 55-59', 0.80),
-    "60-64": get_value(demographics, 'Homeownership 60-64', 0.85),
-}
-
-education_rate = get_value(demographics, 'Higher Education Rate', 0.304)
-
-# Calculate audience estimates
-audience_results = calculate_target_audience(
-    total_population, foreign_percentage, age_distribution,
-    homeownership_rates, education_rate, social_media_usage_sarah,
-    social_media_usage_non_sarah, margin_of_errors
-)
-
-print("Audience Estimation Results:")
-for key, value in audience_results.items():
-    print(f"{key}: {value:.2f}")
 
 # Define CPM and budget inputs
 cpm_ranges = {
@@ -82,23 +72,39 @@ cpm_ranges = {
 # Define ad frequency per user per month (adjust as needed)
 ad_frequency_per_month = 10
 
-# Adjusted audience sizes
-adjusted_target_audience_splits = {
-    "Sarah (höhere Bildung)": audience_results["Sarah_Effective_Reach_Higher_Ed"],
-    "Nicht-Sarah (höhere Bildung)": audience_results["Non_Sarah_Effective_Reach_Higher_Ed"],
-    "Alle ohne höhere Bildung": total_population - audience_results["Sarah_Effective_Reach_Higher_Ed"] -
-                                audience_results["Non_Sarah_Effective_Reach_Higher_Ed"]
-}
 
-# Generate 12-month period
-from datetime import datetime, timedelta
+def main(file_path="constants.xlsx"):
+    # Load constants from external spreadsheet, fallback to defaults
+    inputs = build_audience_inputs(*load_constants_from_excel(file_path))
+
+    # Calculate audience estimates
+    audience_results = calculate_target_audience(**inputs)
+
+    print("Audience Estimation Results:")
+    for key, value in audience_results.items():
+        print(f"{key}: {value:.2f}")
+
+    # Adjusted audience sizes
+    adjusted_target_audience_splits = calculate_audience_splits(audience_results, inputs["total_population"])
+
+    # Generate 12-month period
+    start_date = datetime(2025, 5, 1)
+    months = [start_date + timedelta(days=30 * i) for i in range(12)]
+
+    # Calculate budget
+    budget_cube = calculate_budget_cube(adjusted_target_audience_splits, cpm_ranges, ad_frequency_per_month, months)
+    first_month = budget_cube.xs(months[0], level="Month")
+
+    print("\nBudget Estimation Results (for one month):")
+    for (platform, audience, _, _), (min_budget, expected_budget, max_budget) in \
+            first_month[["Min", "Expected", "Max"]].iterrows():
+        print(f"{platform} - {audience}: Min: {min_budget:.2f} €, Expected: {expected_budget:.2f} €, Max: {max_budget:.2f} €")
 
-start_date = datetime(2025, 5, 1)
-months = [start_date + timedelta(days=30 * i) for i in range(12)]
+    print(f"\nBudget Estimation Results (for {len(months)} months):")
+    yearly_budget = budget_cube.groupby(level="Platform", sort=False)[["Min", "Expected", "Max"]].sum()
+    for platform, (min_budget, expected_budget, max_budget) in yearly_budget.iterrows():
+        print(f"{platform}: Min: {min_budget:.2f} €, Expected: {expected_budget:.2f} €, Max: {max_budget:.2f} €")
 
-# Calculate budget
-budget_results = calculate_budget(adjusted_target_audience_splits, cpm_ranges, ad_frequency_per_month, months)
 
-print("\nBudget Estimation Results (for one month):")
-for key, (min_budget, expected_budget, max_budget) in budget_results.items():
-    print(f"{key}: Min: {min_budget:.2f} €, Expected: {expected_budget:.2f} €, Max: {max_budget:.2f} €")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
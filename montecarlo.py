@@ -0,0 +1,274 @@
+import math
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calculations import _budget_arrays, calculate_audience_splits, calculate_target_audience_frame
+
+
+# Margins of error are read as relative errors in percent at 95% confidence
+Z_95 = 1.959964
+
+REACH_METRICS = (
+    "Sarah_Effective_Reach", "Non_Sarah_Effective_Reach",
+    "Sarah_Effective_Reach_Higher_Ed", "Non_Sarah_Effective_Reach_Higher_Ed",
+)
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with bounded memory and relative accuracy (log-spaced buckets, DDSketch style).
+
+    Every value is stored in the bucket ``ceil(log_gamma(|x|))``, so any reported quantile is within
+    ``relative_accuracy`` of the true one. Sketches built from disjoint data can be merged exactly, which
+    makes them safe to build in parallel.
+    """
+
+    def __init__(self, relative_accuracy=0.001):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        self.count += values.size
+        self.total += float(values.sum())
+        self.zeros += int(np.count_nonzero(values == 0))
+        for store, selected in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if selected.size:
+                keys, counts = np.unique(np.ceil(np.log(selected) / self.log_gamma).astype(np.int64), return_counts=True)
+                for key, count in zip(keys.tolist(), counts.tolist()):
+                    store[key] = store.get(key, 0) + count
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else float("nan")
+
+    def _bucket_value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q):
+        if not self.count:
+            return float("nan")
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._bucket_value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._bucket_value(key)
+        return self._bucket_value(max(self.positive))
+
+
+class CountSketch:
+    """
+    Exact quantiles for integer-valued metrics such as the rounded budgets.
+
+    Keeps one count per distinct value, so memory depends on the spread of the values, not on the number
+    of draws. Same interface as QuantileSketch.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, values):
+        values = np.asarray(values).ravel()
+        self.count += values.size
+        self.total += float(values.sum())
+        keys, counts = np.unique(values, return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.count += other.count
+        self.total += other.total
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else float("nan")
+
+    def quantile(self, q):
+        if not self.count:
+            return float("nan")
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen > rank:
+                return float(key)
+        return float(max(self.counts))
+
+
+def input_columns(inputs):
+    """Flattens calculate_target_audience arguments into the scenario column names used by scenario_arguments."""
+    columns = {
+        "Total Population": inputs["total_population"],
+        "Foreign Percentage": inputs["foreign_percentage"],
+        "Higher Education Rate": inputs["education_rate"],
+    }
+    for prefix, argument in (
+            ("Age ", "age_distribution"),
+            ("Homeownership ", "homeownership_rates"),
+            ("Usage Sarah ", "social_media_usage_sarah"),
+            ("Usage Non-Sarah ", "social_media_usage_non_sarah"),
+    ):
+        columns.update({f"{prefix}{key}": value for key, value in inputs[argument].items()})
+    return columns
+
+
+def _error_columns(columns, margin_of_errors):
+    """
+    Maps each margin of error onto the input columns it covers.
+
+    A category applies to the column of the same name, or to every column it prefixes, so "Homeownership"
+    covers all "Homeownership <age>" columns. Returns the errors per column and the categories that
+    match no input (and are therefore not sampled).
+    """
+    errors = {}
+    unmatched = []
+    for category, error in margin_of_errors.items():
+        matched = [column for column in columns if column == category or column.startswith(f"{category} ")]
+        errors.update({column: error for column in matched})
+        if not matched:
+            unmatched.append(category)
+    return errors, unmatched
+
+
+def _bounds(column):
+    if column == "Total Population" or column.startswith("Age "):
+        return 0, np.inf
+    if column == "Foreign Percentage":
+        return 0, 100
+    return 0, 1
+
+
+def _simulate_chunk(task):
+    """Samples one chunk of draws and returns a sketch per metric."""
+    size, seed, inputs, cpm_ranges, ad_frequency_per_month, relative_accuracy = task
+    rng = np.random.default_rng(seed)
+    columns = input_columns(inputs)
+    errors, _ = _error_columns(columns, inputs["margin_of_errors"])
+
+    samples = {}
+    for column, error in errors.items():
+        base = columns[column]
+        sigma = abs(base) * error / 100 / Z_95
+        samples[column] = np.clip(rng.normal(base, sigma, size), *_bounds(column))
+    scenarios = pd.DataFrame(samples, index=pd.RangeIndex(size))
+
+    audience = calculate_target_audience_frame(scenarios, **inputs)
+    total_population = samples.get("Total Population", inputs["total_population"])
+    splits = calculate_audience_splits(audience, total_population)
+
+    metrics = {key: audience[key].to_numpy() for key in REACH_METRICS}
+
+    # Same budgets as calculate_budget, with every draw laid out along the audience axis
+    sizes = np.stack([np.broadcast_to(np.asarray(split_size, dtype=float), (size,)) for split_size in splits.values()])
+    _, min_budget, expected_budget, max_budget = _budget_arrays(
+        sizes.ravel(), list(cpm_ranges.values()), np.asarray([ad_frequency_per_month], dtype=float),
+        np.ones(1), np.ones(1)
+    )
+    expected_budget = expected_budget.reshape(len(cpm_ranges), len(splits), size)
+    for platform_index, platform in enumerate(cpm_ranges):
+        for audience_index, audience_name in enumerate(splits):
+            metrics[f"{platform} - {audience_name}"] = expected_budget[platform_index, audience_index]
+    metrics["Total Budget Min"] = min_budget.reshape(-1, size).sum(axis=0)
+    metrics["Total Budget Expected"] = expected_budget.reshape(-1, size).sum(axis=0)
+    metrics["Total Budget Max"] = max_budget.reshape(-1, size).sum(axis=0)
+
+    # The rounded budgets are integers and get exact counts; log buckets would be wider than their spread
+    sketches = {}
+    for key, values in metrics.items():
+        integer = np.issubdtype(np.asarray(values).dtype, np.integer) and key not in REACH_METRICS
+        sketches[key] = CountSketch() if integer else QuantileSketch(relative_accuracy)
+        sketches[key].add(np.broadcast_to(values, (size,)))
+    return sketches
+
+
+def run_monte_carlo(
+        inputs, cpm_ranges, ad_frequency_per_month, draws=1_000_000, seed=None,
+        chunk_size=250_000, workers=None, quantiles=(0.025, 0.5, 0.975), relative_accuracy=0.001
+):
+    """
+    Propagates the margins of error through the audience and budget chain by Monte Carlo sampling.
+
+    ``inputs`` holds the calculate_target_audience arguments. Each input covered by ``margin_of_errors``
+    is drawn from a normal distribution whose 95% interval is the stated relative error; categories
+    that match no input are reported with a warning. Every draw goes through calculate_audience_splits
+    and the calculate_budget arithmetic. Draws are processed in chunks and only quantile sketches are
+    kept, so memory does not grow with ``draws``: log-bucket sketches (within ``relative_accuracy``) for
+    the reaches and exact counts for the integer budgets. Chunks run on a process pool when more than
+    one worker is available; results depend only on ``seed``, not on the number of workers.
+
+    Returns a DataFrame with one row per metric holding the mean and the requested quantiles: the
+    effective reaches, the expected budget per "<platform> - <audience>" (the calculate_budget keys)
+    and the total Min, Expected and Max budget.
+    """
+    errors, unmatched = _error_columns(input_columns(inputs), inputs["margin_of_errors"])
+    if unmatched:
+        warnings.warn(f"Margins of error not matching any input are not sampled: {', '.join(map(str, unmatched))}")
+    if not errors:
+        warnings.warn("No input is sampled, so every draw gives the same result")
+
+    chunk_sizes = [chunk_size] * (draws // chunk_size)
+    if draws % chunk_size:
+        chunk_sizes.append(draws % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [
+        (size, chunk_seed, inputs, cpm_ranges, ad_frequency_per_month, relative_accuracy)
+        for size, chunk_seed in zip(chunk_sizes, seeds)
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    sketches = {}
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_results = executor.map(_simulate_chunk, tasks)
+            for chunk_sketches in chunk_results:
+                _merge_into(sketches, chunk_sketches)
+    else:
+        for task in tasks:
+            _merge_into(sketches, _simulate_chunk(task))
+
+    rows = {}
+    for key, sketch in sketches.items():
+        rows[key] = {"Mean": sketch.mean}
+        rows[key].update({f"P{q * 100:g}": sketch.quantile(q) for q in quantiles})
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def _merge_into(sketches, chunk_sketches):
+    for key, sketch in chunk_sketches.items():
+        if key in sketches:
+            sketches[key].merge(sketch)
+        else:
+            sketches[key] = sketch
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+
+def segments_from_batch(audience_row, social_media_usage_sarah, social_media_usage_non_sarah, higher_ed=False):
+    """Builds optimizer segments from one row of calculate_target_audience_batch results."""
+    suffix = "_Higher_Ed" if higher_ed else ""
+    segment_sizes = {
+        "Sarah": float(audience_row[f"Sarah_Population{suffix}"]),
+        "Non_Sarah": float(audience_row[f"Non_Sarah_Population{suffix}"]),
+    }
+    segment_usage = {"Sarah": social_media_usage_sarah, "Non_Sarah": social_media_usage_non_sarah}
+    return segment_sizes, segment_usage
+
+
+def _coordinate_sweeps(spend, saturation, usage, unit_cost, multiplier, sweeps):
+    """
+    Gauss-Seidel sweeps of the closed-form per-platform optimum for a fixed reach-per-euro ``multiplier``.
+
+    With the other platforms fixed, the marginal reach of platform k is
+    ``N * C_-k * p_k / a_k * exp(-x_k / a_k)``, so the stationary point is
+    ``x_k = a_k * ln(C_-k / (multiplier * unit_cost_k))``, clipped at zero.
+    """
+    active = saturation > 0
+    safe_saturation = np.where(active, saturation, 1.0)
+    for _ in range(sweeps):
+        for k in range(spend.shape[-1]):
+            miss = 1 - usage * (1 - np.exp(-spend / safe_saturation))
+            others = np.prod(np.delete(miss, k, axis=-1), axis=-1)
+            optimum = saturation[..., k] * np.log(others / (multiplier[:, None] * unit_cost[k]))
+            spend[..., k] = np.where(active[..., k], np.maximum(optimum, 0), 0)
+    return spend
+
+
+def _reach(spend, saturation, usage, sizes):
+    safe_saturation = np.where(saturation > 0, saturation, 1.0)
+    miss = 1 - usage * (1 - np.exp(-spend / safe_saturation))
+    return sizes * (1 - np.prod(miss, axis=-1))
+
+
+def optimize_allocation(
+        budgets, segment_sizes, segment_usage, cpm_ranges, ad_frequency_per_month, cpm="expected",
+        bisection_steps=60, sweeps=3, final_sweeps=50
+):
+    """
+    Finds the platform × segment split of each monthly budget that maximizes deduplicated effective reach.
+
+    A segment of ``N`` people uses platform k with probability ``p_k`` (``segment_usage``). Spending
+    ``x`` on platform k reaches a share ``1 - exp(-x / a)`` of its users, where ``a = N * p_k *
+    ad_frequency_per_month * cpm_k / 1000`` is the budget calculate_budget would assign to showing every
+    platform user the full frequency once. Platforms are combined with the same ``1 - prod(1 - p)``
+    overlap logic as calculate_target_audience, so unlimited spend converges to its effective reach.
+
+    Reach is concave in spend, so the optimum satisfies equal marginal reach per euro on every funded
+    platform. All budget levels are solved at once by bisecting that marginal value, warm-starting the
+    closed-form coordinate updates from the previous step. ``cpm`` picks "min", "expected" or "max"
+    from ``cpm_ranges``; platforms without a usage entry are never funded.
+
+    Returns ``(frontier, allocation)``: the reach-vs-spend frontier indexed by budget (Spend, Reach,
+    Marginal_Reach_per_EUR) and the spend per (Platform, Segment) for each budget.
+    """
+    budgets = np.atleast_1d(np.asarray(budgets, dtype=float))
+    segments = list(segment_sizes)
+    platforms = list(cpm_ranges)
+
+    cpm_column = {"min": 0, "max": 1}
+    unit_cpm = np.asarray([
+        np.mean(cpm_ranges[platform]) if cpm == "expected" else cpm_ranges[platform][cpm_column[cpm]]
+        for platform in platforms
+    ], dtype=float)
+    unit_cost = ad_frequency_per_month * unit_cpm / 1000
+
+    sizes = np.asarray([segment_sizes[segment] for segment in segments], dtype=float)
+    usage = np.asarray([
+        [segment_usage[segment].get(platform, 0.0) for platform in platforms] for segment in segments
+    ], dtype=float)
+    saturation = sizes[:, None] * usage * unit_cost[None, :]
+
+    # Marginal reach per euro is at most 1 / unit_cost (first euro on an untouched platform)
+    high = np.full(len(budgets), np.log(1 / unit_cost[saturation.any(axis=0)].min()) if saturation.any() else 0.0)
+    low = high - 40.0
+    spend = np.zeros((len(budgets), len(segments), len(platforms)))
+
+    for _ in range(bisection_steps):
+        middle = (low + high) / 2
+        spend = _coordinate_sweeps(spend, saturation, usage, unit_cost, np.exp(middle), sweeps)
+        over_budget = spend.sum(axis=(1, 2)) > budgets
+        low = np.where(over_budget, middle, low)
+        high = np.where(over_budget, high, middle)
+
+    # Polish at the feasible end of the bracket and scale down any residual overshoot
+    spend = _coordinate_sweeps(spend, saturation, usage, unit_cost, np.exp(high), final_sweeps)
+    total = spend.sum(axis=(1, 2))
+    spend *= np.where(total > budgets, budgets / np.where(total > 0, total, 1), 1)[:, None, None]
+
+    reach = _reach(spend, saturation, usage, sizes).sum(axis=-1)
+    frontier = pd.DataFrame({
+        "Spend": spend.sum(axis=(1, 2)),
+        "Reach": reach,
+        "Marginal_Reach_per_EUR": np.exp(high),
+    }, index=pd.Index(budgets, name="Budget"))
+    allocation = pd.DataFrame(
+        spend.transpose(0, 2, 1).reshape(len(budgets), -1),
+        index=frontier.index,
+        columns=pd.MultiIndex.from_product([platforms, segments], names=["Platform", "Segment"]),
+    )
+    return frontier, allocation
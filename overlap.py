@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+
+def subset_sums(masses):
+    """
+    Zeta transform over the last axis: ``result[A] = sum(masses[S] for S ⊆ A)`` for every bitmask A.
+
+    Runs in O(k · 2^k) per leading index, where the last axis has length 2^k.
+    """
+    sums = np.array(masses, dtype=float)
+    size = sums.shape[-1]
+    leading = sums.shape[:-1]
+    k = size.bit_length() - 1
+    if size != 1 << k:
+        raise ValueError("The last axis must have a power-of-two length")
+    for bit in range(k):
+        view = sums.reshape(leading + (size >> (bit + 1), 2, 1 << bit))
+        view[..., 1, :] += view[..., 0, :]
+    return sums
+
+
+class JointUsage:
+    """
+    Joint platform usage: the share of people using exactly each subset of platforms, per segment.
+
+    Subsets are bitmasks over ``platforms`` (bit i = platform i). The subset sums are precomputed
+    once, so the deduplicated reach of any platform subset T is a lookup:
+    ``reach(T) = 1 - P(used platforms ⊆ not T)``. All 2^k subset reaches of every segment come from
+    the same index. Instances can be passed to calculate_target_audience in place of the
+    per-platform usage dicts to replace the independence assumption.
+    """
+
+    def __init__(self, platforms, masses, segments=None):
+        self.platforms = list(platforms)
+        masses = np.asarray(masses, dtype=float)
+        if masses.shape[-1] != 1 << len(self.platforms):
+            raise ValueError(f"Expected {1 << len(self.platforms)} subset masses for {len(self.platforms)} platforms")
+        totals = masses.sum(axis=-1, keepdims=True)
+        if np.any(totals <= 0):
+            raise ValueError("Every segment needs a positive total mass")
+        self.masses = masses / totals
+        self.segments = segments
+        self.never_used = subset_sums(self.masses)
+
+    @classmethod
+    def from_subsets(cls, distribution, platforms=None):
+        """Builds a single-segment distribution from ``{tuple_of_platforms: share}``; () is the non-users."""
+        if platforms is None:
+            platforms = sorted({platform for subset in distribution for platform in subset})
+        position = {platform: index for index, platform in enumerate(platforms)}
+        masses = np.zeros(1 << len(platforms))
+        for subset, share in distribution.items():
+            masses[sum(1 << position[platform] for platform in set(subset))] += share
+        return cls(platforms, masses)
+
+    @classmethod
+    def from_marginals(cls, social_media_usage):
+        """Builds the independent joint distribution implied by per-platform usage rates."""
+        platforms = list(social_media_usage)
+        bits = (np.arange(1 << len(platforms))[:, None] >> np.arange(len(platforms))) & 1
+        probabilities = np.asarray([social_media_usage[platform] for platform in platforms], dtype=float)
+        masses = np.prod(np.where(bits == 1, probabilities, 1 - probabilities), axis=1)
+        return cls(platforms, masses)
+
+    @classmethod
+    def from_microdata(cls, respondents, platforms, weight=None, segment=None):
+        """
+        Compresses respondent-level survey data into subset counts.
+
+        ``respondents`` has one truthy/falsy column per platform, plus optional survey weight and
+        segment columns. With ``segment`` the result holds one distribution per segment, and every
+        respondent needs a segment value.
+        """
+        masks = np.zeros(len(respondents), dtype=np.int64)
+        for index, platform in enumerate(platforms):
+            masks |= respondents[platform].fillna(False).astype(bool).to_numpy().astype(np.int64) << index
+        weights = respondents[weight].to_numpy(dtype=float) if weight else None
+        size = 1 << len(platforms)
+
+        if segment is None:
+            return cls(platforms, np.bincount(masks, weights=weights, minlength=size))
+        codes, segments = pd.factorize(respondents[segment], sort=True)
+        if np.any(codes < 0):
+            raise ValueError(
+                f"{np.count_nonzero(codes < 0)} respondents have no {segment!r} value; drop or fill them first"
+            )
+        counts = np.bincount(codes * size + masks, weights=weights, minlength=len(segments) * size)
+        return cls(platforms, counts.reshape(len(segments), size), list(segments))
+
+    def _mask(self, platforms):
+        if platforms is None:
+            return (1 << len(self.platforms)) - 1
+        position = {platform: index for index, platform in enumerate(self.platforms)}
+        return sum(1 << position[platform] for platform in set(platforms))
+
+    def segment(self, name):
+        """Returns the distribution of one segment as its own JointUsage."""
+        if self.segments is None:
+            raise ValueError("This distribution has no segments")
+        return JointUsage(self.platforms, self.masses[self.segments.index(name)])
+
+    def reach(self, platforms=None):
+        """Share of people using at least one of ``platforms`` (default: all), per segment."""
+        full = (1 << len(self.platforms)) - 1
+        return 1 - self.never_used[..., full ^ self._mask(platforms)]
+
+    def all_reaches(self):
+        """Deduplicated reach for every platform subset, as a Series (or a DataFrame with one row per segment)."""
+        reaches = 1 - self.never_used[..., ::-1]
+        labels = [
+            " + ".join(platform for index, platform in enumerate(self.platforms) if mask >> index & 1) or "(none)"
+            for mask in range(1 << len(self.platforms))
+        ]
+        if reaches.ndim == 1:
+            return pd.Series(reaches, index=labels, name="Reach")
+        return pd.DataFrame(reaches, index=self.segments, columns=labels)
+
+    def marginals(self):
+        """Per-platform usage rates, in the same format as the social media usage dicts."""
+        return {platform: self.reach([platform]) for platform in self.platforms}
@@ -0,0 +1,116 @@
+import functools
+import os
+import threading
+import time
+import tracemalloc
+
+
+# Hot-path instrumentation is opt-in: set REGIOS_PROFILE=1 (or "alloc" to also track allocations)
+PROFILE_MODE = os.environ.get("REGIOS_PROFILE", "")
+
+# Latency histogram bucket upper bounds in microseconds (powers of two), plus an overflow bucket
+BUCKETS_US = [2 ** exponent for exponent in range(0, 24)]
+
+
+class CallStats:
+    """Call count, latency histogram and allocation peaks for one instrumented function."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = [0] * (len(BUCKETS_US) + 1)
+        self.peak_bytes = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, peak_bytes=0):
+        micros = seconds * 1e6
+        bucket = next((index for index, bound in enumerate(BUCKETS_US) if micros <= bound), len(BUCKETS_US))
+        with self.lock:
+            self.calls += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.histogram[bucket] += 1
+            self.peak_bytes = max(self.peak_bytes, peak_bytes)
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "total_seconds": self.total_seconds,
+            "mean_us": self.total_seconds / self.calls * 1e6 if self.calls else 0.0,
+            "max_us": self.max_seconds * 1e6,
+            "peak_bytes": self.peak_bytes,
+            "histogram_us": {
+                (f"<={bound}" if index < len(BUCKETS_US) else f">{BUCKETS_US[-1]}"): count
+                for index, (bound, count) in enumerate(zip(BUCKETS_US + [None], self.histogram)) if count
+            },
+        }
+
+
+REGISTRY = {}
+
+# Per-thread stack of [baseline bytes, highest peak seen] for the instrumented calls in progress
+_allocation_frames = threading.local()
+
+
+def _enter_allocation_frame():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    stack = _allocation_frames.__dict__.setdefault("stack", [])
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        # Resetting the peak below would lose the caller's peak so far, so keep it in the caller's frame
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    stack.append([current, 0])
+
+
+def _exit_allocation_frame():
+    stack = _allocation_frames.stack
+    baseline, seen = stack.pop()
+    peak = max(tracemalloc.get_traced_memory()[1], seen)
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    return peak - baseline
+
+
+def profiled(func, track_allocations=False):
+    """Wraps ``func`` so every call is recorded in REGISTRY under its qualified name."""
+    stats = REGISTRY.setdefault(f"{func.__module__}.{func.__qualname__}", CallStats())
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if track_allocations:
+            _enter_allocation_frame()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            peak_bytes = _exit_allocation_frame() if track_allocations else 0
+            stats.record(seconds, peak_bytes)
+
+    wrapper.__wrapped__ = func
+    return wrapper
+
+
+def hot_path(func):
+    """
+    Marks a function as a hot path.
+
+    Without REGIOS_PROFILE the function is returned unchanged, so there is no overhead. Allocation
+    peaks are measured per call and include nested instrumented calls. tracemalloc tracks the whole
+    process, so calls running concurrently in other threads are included in each other's peaks.
+    """
+    if not PROFILE_MODE:
+        return func
+    return profiled(func, track_allocations=PROFILE_MODE == "alloc")
+
+
+def report():
+    return {name: stats.as_dict() for name, stats in REGISTRY.items() if stats.calls}
+
+
+def reset():
+    for stats in REGISTRY.values():
+        stats.__init__()
@@ -0,0 +1,170 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calculations import (
+    SCENARIO_COLUMN_PREFIXES, SCENARIO_COLUMNS, _budget_arrays, calculate_audience_splits,
+    calculate_target_audience_frame
+)
+
+
+REACH_COLUMNS = (
+    "Sarah_Effective_Reach",
+    "Non_Sarah_Effective_Reach",
+    "Sarah_Effective_Reach_Higher_Ed",
+    "Non_Sarah_Effective_Reach_Higher_Ed",
+)
+
+
+def _is_input_column(column):
+    return column in SCENARIO_COLUMNS or column.startswith(tuple(SCENARIO_COLUMN_PREFIXES))
+
+
+def _region_scenarios(regions, variants, age_groups):
+    """
+    Expands a chunk of regions into one scenario row per region and variant.
+
+    Age columns given as "Age Share <group>" are shares of the region's citizens; they are passed on as
+    "Age <group>" with a national population of 1, so every age group in ``age_groups`` needs a share
+    column. Variant columns override region columns.
+    """
+    scenarios = regions.reset_index(drop=True)
+    share_columns = [column for column in scenarios.columns if column.startswith("Age Share ")]
+    if share_columns:
+        missing = [age for age in age_groups if f"Age Share {age}" not in share_columns]
+        if missing:
+            raise ValueError(
+                "Age shares replace the whole age distribution; missing Age Share columns for: "
+                + ", ".join(missing)
+            )
+        scenarios = scenarios.rename(
+            columns={column: "Age " + column[len("Age Share "):] for column in share_columns}
+        )
+        scenarios["National Population"] = 1.0
+
+    if variants is None:
+        return scenarios
+    variants = variants.rename_axis("Variant").reset_index()
+    scenarios = scenarios.drop(columns=[column for column in variants.columns if column in scenarios.columns])
+    return scenarios.merge(variants, how="cross")
+
+
+def estimate_regions(regions, cpm_ranges, ad_frequency_per_month, variants=None, key_columns=None, **defaults):
+    """
+    Estimates effective reach and expected monthly budget for every region in a table.
+
+    ``regions`` has one row per region with the scenario columns understood by scenario_arguments
+    (e.g. "Total Population", "Foreign Percentage", "Homeownership 30-34"), and may give the age
+    distribution as "Age Share <group>" columns (one per age group). ``variants`` optionally holds
+    scenario variants that are crossed with every region. Inputs missing from both tables come from
+    ``defaults``.
+
+    Returns one row per region (and variant) with the key columns, the effective reaches, the
+    audience splits and the expected budget per platform, computed the same way as calculate_budget.
+    """
+    scenarios = _region_scenarios(regions, variants, defaults.get("age_distribution") or {})
+    audience = calculate_target_audience_frame(scenarios, **defaults)
+    total_population = scenarios["Total Population"].to_numpy(dtype=float) \
+        if "Total Population" in scenarios else defaults["total_population"]
+    splits = calculate_audience_splits(audience, total_population)
+
+    if key_columns is None:
+        key_columns = [column for column in scenarios.columns if not _is_input_column(column)]
+    elif variants is not None:
+        key_columns = list(key_columns) + ["Variant"]
+
+    results = scenarios[key_columns].copy()
+    for column in REACH_COLUMNS:
+        results[column] = audience[column].to_numpy()
+    for audience_name, size in splits.items():
+        results[audience_name] = np.broadcast_to(size, len(results))
+
+    # Same budgets as calculate_budget, with every region laid out along the audience axis
+    sizes = np.stack([
+        np.broadcast_to(np.asarray(size, dtype=float), (len(results),)) for size in splits.values()
+    ])
+    _, _, expected_budget, _ = _budget_arrays(
+        sizes.ravel(), list(cpm_ranges.values()), np.asarray([ad_frequency_per_month], dtype=float),
+        np.ones(1), np.ones(1)
+    )
+    budget_by_platform = expected_budget.reshape(len(cpm_ranges), len(splits), len(results)).sum(axis=1)
+    for platform, budget in zip(cpm_ranges, budget_by_platform):
+        results[f"Budget {platform}"] = budget
+    results["Total Budget"] = budget_by_platform.sum(axis=0)
+
+    return results
+
+
+def read_region_chunks(path, chunk_size=500):
+    """Yields the region table in chunks from a CSV or Parquet file without loading it completely."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as error:
+            raise ImportError("Reading Parquet region tables requires pyarrow") from error
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _estimate_chunk(task):
+    regions, cpm_ranges, ad_frequency_per_month, variants, key_columns, defaults = task
+    return estimate_regions(regions, cpm_ranges, ad_frequency_per_month, variants, key_columns, **defaults)
+
+
+def stream_regions(
+        chunks, cpm_ranges, ad_frequency_per_month, variants=None, key_columns=None, workers=1, **defaults
+):
+    """
+    Runs estimate_regions over an iterable of region chunks and yields one result frame per chunk.
+
+    With ``workers`` > 1 the chunks are processed on a process pool; at most two chunks per worker are
+    in flight, so neither the input nor the region × variant results are ever fully materialized.
+    Results are yielded in input order.
+    """
+    tasks = ((chunk, cpm_ranges, ad_frequency_per_month, variants, key_columns, defaults) for chunk in chunks)
+    if workers <= 1:
+        for task in tasks:
+            yield _estimate_chunk(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_estimate_chunk, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def write_region_estimates(source, destination, cpm_ranges, ad_frequency_per_month, variants=None,
+                           chunk_size=500, workers=1, **defaults):
+    """Streams a region table from ``source`` and appends the estimates to the CSV file ``destination``."""
+    chunks = read_region_chunks(source, chunk_size)
+    for index, results in enumerate(stream_regions(
+            chunks, cpm_ranges, ad_frequency_per_month, variants, workers=workers, **defaults)):
+        results.to_csv(destination, mode="w" if index == 0 else "a", header=index == 0, index=False)
+
+
+if __name__ == "__main__":
+    from main import ad_frequency_per_month, build_audience_inputs, cpm_ranges, load_constants_from_excel
+
+    parser = argparse.ArgumentParser(description="Estimates reach and budget for every region in a table.")
+    parser.add_argument("source", help="region table (.csv or .parquet)")
+    parser.add_argument("destination", help="output CSV file")
+    parser.add_argument("--variants", help="optional CSV of scenario variants crossed with every region")
+    parser.add_argument("--constants", default="constants.xlsx")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    defaults = build_audience_inputs(*load_constants_from_excel(args.constants))
+    variants = pd.read_csv(args.variants) if args.variants else None
+    write_region_estimates(args.source, args.destination, cpm_ranges, ad_frequency_per_month, variants,
+                           args.chunk_size, args.workers, **defaults)
@@ -0,0 +1,257 @@
+import argparse
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from calculations import (
+    _age_group_population, _austrian_citizens, _effective_reach, _homeowners_by_age, _homeowners_higher_ed,
+    _reach_factor, _segment_populations, calculate_audience_splits, calculate_budget, calculate_revenue,
+    calculate_roas
+)
+from main import ad_frequency_per_month, build_audience_inputs, cpm_ranges, load_constants_from_excel
+
+
+# Performance assumptions for the ROAS step (adjust as needed or override per request)
+PERFORMANCE_DEFAULTS = {
+    "click_through_rate": 0.005,
+    "conversion_rate": 0.02,
+    "avg_order_value": 100,
+}
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache."""
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+def _json_default(value):
+    """Makes inputs that are not plain JSON hashable: joint usage distributions by platforms and masses."""
+    if hasattr(value, "masses") and hasattr(value, "platforms"):
+        return {
+            "platforms": value.platforms,
+            "segments": value.segments,
+            "masses": hashlib.blake2b(value.masses.tobytes(), digest_size=16).hexdigest(),
+        }
+    return float(value)
+
+
+class ScenarioGraph:
+    """
+    Evaluates the pipeline as a dependency graph of named nodes with memoized results.
+
+    Every input gets a key from a hash of its value, and every node a key from the hash of its
+    dependencies' keys. Results are cached under the node key, so after a single input changes only
+    the nodes downstream of it are recomputed; everything else is a cache hit.
+    """
+
+    def __init__(self, nodes, cache_size=4096):
+        self.nodes = nodes
+        self.cache = LRUCache(cache_size)
+
+    @staticmethod
+    def _hash(*parts):
+        return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+    def _key(self, name, inputs, keys):
+        if name not in keys:
+            if name in self.nodes:
+                dependencies, _ = self.nodes[name]
+                keys[name] = self._hash(name, *(self._key(dependency, inputs, keys) for dependency in dependencies))
+            else:
+                keys[name] = self._hash(name, json.dumps(inputs[name], sort_keys=True, default=_json_default))
+        return keys[name]
+
+    def _value(self, name, inputs, keys):
+        if name not in self.nodes:
+            return inputs[name]
+        key = self._key(name, inputs, keys)
+        found, value = self.cache.get(key)
+        if not found:
+            dependencies, function = self.nodes[name]
+            value = function(*(self._value(dependency, inputs, keys) for dependency in dependencies))
+            self.cache.put(key, value)
+        return value
+
+    def evaluate(self, inputs, targets):
+        """Returns the target values; they are copies, so callers may modify them without touching the cache."""
+        keys = {}
+        return {target: copy.deepcopy(self._value(target, inputs, keys)) for target in targets}
+
+
+def _budget(splits, cpm_ranges, ad_frequency_per_month):
+    budget = calculate_budget(splits, cpm_ranges, ad_frequency_per_month, [None])
+    return {key: list(values) for key, values in budget.items()}
+
+
+def _roas(splits, budget, cpm_ranges, ad_frequency_per_month, click_through_rate, conversion_rate, avg_order_value):
+    # Every audience is bought on every platform, as in the budget
+    impressions = sum(splits.values()) * ad_frequency_per_month * len(cpm_ranges)
+    revenue = calculate_revenue(impressions * click_through_rate, conversion_rate, avg_order_value)
+    ad_spend = sum(expected for _, expected, _ in budget.values())
+    return {"Revenue": revenue, "Ad_Spend": ad_spend, "ROAS": calculate_roas(revenue, ad_spend)}
+
+
+# Node name -> (dependencies, function); names that are not nodes are inputs
+PIPELINE = {
+    "austrian_citizens": (("total_population", "foreign_percentage"), _austrian_citizens),
+    "age_groups": (("austrian_citizens", "age_distribution", "national_population"), _age_group_population),
+    "homeowners": (("age_groups", "homeownership_rates"), _homeowners_by_age),
+    "homeowners_higher_ed": (("homeowners", "education_rate"), _homeowners_higher_ed),
+    "segments": (("homeowners", "homeowners_higher_ed"), _segment_populations),
+    "sarah_reach_share": (("social_media_usage_sarah",), _reach_factor),
+    "non_sarah_reach_share": (("social_media_usage_non_sarah",), _reach_factor),
+    "audience": (("segments", "sarah_reach_share", "non_sarah_reach_share", "margin_of_errors"), _effective_reach),
+    "splits": (("audience", "total_population"), calculate_audience_splits),
+    "budget": (("splits", "cpm_ranges", "ad_frequency_per_month"), _budget),
+    "roas": (
+        (
+            "splits", "budget", "cpm_ranges", "ad_frequency_per_month",
+            "click_through_rate", "conversion_rate", "avg_order_value",
+        ),
+        _roas,
+    ),
+}
+
+
+def load_base_inputs(file_path):
+    inputs = build_audience_inputs(*load_constants_from_excel(file_path))
+    inputs.update(national_population=9000000, cpm_ranges=cpm_ranges, ad_frequency_per_month=ad_frequency_per_month)
+    inputs.update(PERFORMANCE_DEFAULTS)
+    return inputs
+
+
+def merge_inputs(base, overrides):
+    """Applies request overrides; dict inputs are updated per key, so one age group can change alone."""
+    inputs = dict(base)
+    for name, value in overrides.items():
+        if name not in base:
+            raise KeyError(name)
+        inputs[name] = {**base[name], **value} if isinstance(base[name], dict) and isinstance(value, dict) else value
+    return inputs
+
+
+class WhatIfService:
+    """Holds the constants in memory and answers what-if requests against the cached scenario graph."""
+
+    def __init__(self, file_path="constants.xlsx", cache_size=4096):
+        self.file_path = file_path
+        self.graph = ScenarioGraph(PIPELINE, cache_size)
+        self.base_inputs = load_base_inputs(file_path)
+
+    def reload(self):
+        self.base_inputs = load_base_inputs(self.file_path)
+
+    def evaluate(self, overrides=None, targets=("audience", "budget", "roas")):
+        inputs = merge_inputs(self.base_inputs, overrides or {})
+        unknown = [target for target in targets if target not in PIPELINE]
+        if unknown:
+            raise KeyError(", ".join(unknown))
+        return self.graph.evaluate(inputs, targets)
+
+
+class WhatIfHandler(BaseHTTPRequestHandler):
+    """
+    JSON API:
+    GET  /inputs    current base inputs
+    GET  /stats     cache size, hits and misses
+    POST /evaluate  {"inputs": {...overrides}, "targets": ["audience", "budget", "roas"]}
+    POST /reload    re-read the constants workbook
+    """
+
+    service = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, default=float).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/inputs":
+            self._send(200, self.service.base_inputs)
+        elif self.path == "/stats":
+            cache = self.service.graph.cache
+            self._send(200, {"entries": len(cache.entries), "hits": cache.hits, "misses": cache.misses})
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path == "/reload":
+            try:
+                self.service.reload()
+            except Exception as error:
+                self._send(500, {"error": f"Could not reload constants: {error}"})
+                return
+            self._send(200, {"status": "reloaded"})
+            return
+        if self.path != "/evaluate":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("The request body must be a JSON object")
+            overrides = request.get("inputs", {})
+            if overrides is not None and not isinstance(overrides, dict):
+                raise ValueError("\"inputs\" must be a JSON object")
+            targets = request.get("targets", ["audience", "budget", "roas"])
+            if not isinstance(targets, list) or not all(isinstance(target, str) for target in targets):
+                raise ValueError("\"targets\" must be a list of node names")
+            start = time.perf_counter()
+            results = self.service.evaluate(overrides, targets)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except KeyError as error:
+            self._send(400, {"error": f"Unknown input or target: {error.args[0]}"})
+            return
+        except (ValueError, TypeError, AttributeError) as error:
+            self._send(400, {"error": str(error)})
+            return
+        self._send(200, {"results": results, "elapsed_ms": elapsed_ms})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(file_path="constants.xlsx", host="127.0.0.1", port=8050):
+    WhatIfHandler.service = WhatIfService(file_path)
+    server = ThreadingHTTPServer((host, port), WhatIfHandler)
+    print(f"What-if server listening on http://{host}:{port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serves what-if scenario requests from memory.")
+    parser.add_argument("--constants", default="constants.xlsx")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    args = parser.parse_args()
+    serve(args.constants, args.host, args.port)